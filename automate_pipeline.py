@@ -1,10 +1,14 @@
 ### basic usage: python automate_pipeline.py -r "ArissBandoss/moore-tts-new-yt-dataset"
+### dry run:     python automate_pipeline.py --plan --plan_sample 5
 
 
 import os
+import sys
 import subprocess
 import argparse
 
+from helpers.pipeline_planner import plan_pipeline
+
 ### Function to convert all MP3s to WAV
 def convert_mp3_to_wav(input_dir, output_dir):
     """Convert MP3s from subfolders to WAVs."""
@@ -18,10 +22,16 @@ def convert_mp3_to_wav(input_dir, output_dir):
 
 
 ### Function to create audio chunks and filter
-def create_chunks_and_filter(input_dir, output_dir, min_duration=4, max_duration=20):
-    """Create chunks from WAVs and filter them based on duration."""
+def create_chunks_and_filter(input_dir, output_dir, min_duration=4, max_duration=20, dedup_index=None, dedup_mode="skip", dedup_threshold=0.3,
+                             silence_percentile=10, silence_margin=6, silence_window=0, silence_report=None):
+    """Create chunks from WAVs and filter them based on duration and near-duplicates."""
     print(f"\n\n ================   Creating chunks and filtering audios from {input_dir} to {output_dir}...  ================   ")
     cmd = f"python ./create_dataset/create-ljspeech.py -i \"{input_dir}\" -o \"{output_dir}\" --min_duration {min_duration} --max_duration {max_duration}"
+    cmd += f" --silence_percentile {silence_percentile} --silence_margin {silence_margin} --silence_window {silence_window}"
+    if silence_report:
+        cmd += f" --silence_report \"{silence_report}\""
+    if dedup_index:
+        cmd += f" --dedup_index \"{dedup_index}\" --dedup_mode {dedup_mode} --dedup_threshold {dedup_threshold}"
     subprocess.run(cmd, shell=True)
     print("Chunks have been created and filtered.")
 
@@ -45,24 +55,62 @@ def parse_arguments():
                         help="Directory to save the converted WAV files (default: './data/raw_wav_audios')")
     parser.add_argument("-chunked", "--chunked_data_dir", type=str, default="./data/chunked_wav_audios",
                         help="Directory to save the chunked audio files (default: './data/chunked_wav_audios')")
-    parser.add_argument("-r", "--hf_repo", type=str, required=True,
-                        help="The Hugging Face repository to push the dataset (e.g., 'username/repo-name')")
+    parser.add_argument("-r", "--hf_repo", type=str,
+                        help="The Hugging Face repository to push the dataset (e.g., 'username/repo-name'), required unless --plan")
     parser.add_argument("--min_duration", type=int, default=4,
                         help="Minimum duration of audio chunks in seconds (default: 4)")
     parser.add_argument("--max_duration", type=int, default=20,
                         help="Maximum duration of audio chunks in seconds (default: 20)")
-    return parser.parse_args()
+    parser.add_argument("--dedup_index", type=str, default=None,
+                        help="Fingerprint index used to skip near-duplicate audios before transcription (disabled if not set)")
+    parser.add_argument("--dedup_mode", type=str, choices=["skip", "flag"], default="skip",
+                        help="Skip near-duplicates or only flag them in duplicates.csv (default: skip)")
+    parser.add_argument("--dedup_threshold", type=float, default=0.3,
+                        help="Minimum estimated similarity (0-1) for two chunks to count as near-duplicates (default: 0.3)")
+    parser.add_argument("--silence_percentile", type=float, default=10,
+                        help="Percentile of the frame loudness taken as noise floor (default: 10)")
+    parser.add_argument("--silence_margin", type=float, default=6,
+                        help="Distance in dB between the silence threshold and the noise floor (default: 6)")
+    parser.add_argument("--silence_window", type=float, default=0,
+                        help="Estimate the silence threshold per window of this many seconds instead of per file (default: 0)")
+    parser.add_argument("--silence_report", type=str, default=None,
+                        help="CSV comparing chunk counts and kept seconds with the legacy global threshold (disabled if not set)")
+    parser.add_argument("--plan", action="store_true",
+                        help="Only estimate the corpus size and the runtime of each stage, without running the pipeline")
+    parser.add_argument("--plan_sample", type=int, default=3,
+                        help="Number of random WAV files segmented to measure throughput in --plan mode, 0 to only read headers (default: 3)")
+    parser.add_argument("--plan_seed", type=int, default=0,
+                        help="Seed of the random file sample in --plan mode (default: 0)")
+    parser.add_argument("--plan_asr_chunks", type=int, default=0,
+                        help="Number of sampled chunks transcribed to measure ASR throughput in --plan mode (default: 0, skipped)")
+    parser.add_argument("--asr_model", type=str, default="ArissBandoss/whisper-small-mos",
+                        help="ASR model used to measure transcription throughput in --plan mode (default: 'ArissBandoss/whisper-small-mos')")
+    args = parser.parse_args()
+    if not args.plan and not args.hf_repo:
+        parser.error("the following arguments are required: -r/--hf_repo")
+    return args
 
 
 if __name__ == "__main__":
     ### Parse the CLI arguments
     args = parse_arguments()
 
+    ### Dry run: estimate corpus size and per-stage runtime, then stop
+    if args.plan:
+        plan_pipeline(args.raw_data_dir, args.min_duration, args.max_duration,
+                      sample_size=args.plan_sample, seed=args.plan_seed,
+                      silence_percentile=args.silence_percentile, silence_margin=args.silence_margin,
+                      silence_window=args.silence_window, dedup=bool(args.dedup_index),
+                      asr_chunks=args.plan_asr_chunks, asr_model=args.asr_model)
+        sys.exit(0)
+
     ### Step 1: Convert all MP3s in subfolders to WAVs
     #convert_mp3_to_wav(args.input_dir, args.raw_data_dir)
 
     ### Step 2: Create chunks of audios and filter based on duration
-    create_chunks_and_filter(args.raw_data_dir, args.chunked_data_dir, args.min_duration, args.max_duration)
+    create_chunks_and_filter(args.raw_data_dir, args.chunked_data_dir, args.min_duration, args.max_duration,
+                             args.dedup_index, args.dedup_mode, args.dedup_threshold,
+                             args.silence_percentile, args.silence_margin, args.silence_window, args.silence_report)
 
     ### Step 3: Create and push the dataset to Hugging Face
     create_and_push_to_hf(args.chunked_data_dir, args.chunked_data_dir, args.hf_repo)
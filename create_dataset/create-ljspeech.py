@@ -5,13 +5,19 @@ from pydub import AudioSegment
 from pydub.silence import split_on_silence
 import pandas as pd
 import os
+import sys
 import glob
+from collections import Counter
 import numpy as np
 import torch
 from dotenv import load_dotenv
 from transformers import WhisperProcessor, WhisperForConditionalGeneration, pipeline
 from huggingface_hub import login
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from helpers.audio_fingerprint import FingerprintIndex
+from helpers.adaptive_silence import estimate_silence_threshold, split_on_adaptive_silence, summarize_chunks
+
 load_dotenv()
 auth_token = os.getenv('HF_TOKEN')
 login(token=auth_token)
@@ -37,7 +43,9 @@ def transcribe(inputs, model, language):
 
 
 ### function to process audio files
-def process_audio_files(input_dir, output_dir, min_duration=3, max_duration=15):
+def process_audio_files(input_dir, output_dir, min_duration=3, max_duration=15,
+                        dedup_index=None, dedup_mode="skip", dedup_threshold=0.3,
+                        silence_percentile=10, silence_margin=6, silence_window=0, silence_report=None):
     """Process audio files to split them into chunks, transcribe them, and save metadata.
 
     Args:
@@ -45,6 +53,14 @@ def process_audio_files(input_dir, output_dir, min_duration=3, max_duration=15):
         output_dir (str): The directory to save chunked audio files and metadata.
         min_duration (float): Minimum duration for audio chunks in seconds.
         max_duration (float): Maximum duration for audio chunks in seconds.
+        dedup_index (str): Path of the fingerprint index used to detect near-duplicates (optional).
+        dedup_mode (str): "skip" to drop near-duplicates before ASR, "flag" to keep and only report them.
+        dedup_threshold (float): Minimum estimated similarity for two items to count as near-duplicates.
+        silence_percentile (float): Percentile of the frame loudness taken as noise floor.
+        silence_margin (float): Distance (in dB) between the silence threshold and the noise floor.
+        silence_window (float): Length (in seconds) of the windows the threshold is estimated on, 0 for one threshold per file.
+        silence_report (str): Path of a CSV comparing chunk counts and kept seconds with the legacy
+            global threshold (optional, costs one extra split per file).
     """
     audio_dir = os.path.join(output_dir, "audio")
     if not os.path.exists(audio_dir):
@@ -52,10 +68,16 @@ def process_audio_files(input_dir, output_dir, min_duration=3, max_duration=15):
 
     metadata = []
 
+    ### near-duplicate detection, shared across files (and across runs through the index file)
+    index = FingerprintIndex(dedup_index, threshold=dedup_threshold) if dedup_index else None
+    duplicates = []
+    file_duplicate_ratio = 0.5  ### share of duplicate chunks above which the whole file is reported as a near-duplicate
+
     ### parameters for splitting on silence
     min_silence_len = 500  ### minimum length of silence (in ms) to be used for a split
-    silence_thresh = None  ### will be calculated for each file
     keep_silence = 200  ### amount of silence (in ms) to leave at the beginning and end of each chunk
+    legacy_silence_thresh = None  ### global threshold from the first file, only used for the report
+    report = []
 
     ### get list of all WAV files in the directory, sorted alphabetically
     wav_files = sorted(glob.glob(os.path.join(input_dir, "*.wav")))
@@ -64,16 +86,42 @@ def process_audio_files(input_dir, output_dir, min_duration=3, max_duration=15):
         ### load audio file
         print("--> Processing " + wav_file)
         audio = AudioSegment.from_wav(wav_file)
-
-        ### calculate silence threshold for the current file
-        if silence_thresh is None:
-            silence_thresh = audio.dBFS - 14
-
-        ### split the audio into chunks based on silence
-        audio_chunks = split_on_silence(audio, 
-                                        min_silence_len=min_silence_len, 
-                                        silence_thresh=silence_thresh, 
-                                        keep_silence=keep_silence)
+        if legacy_silence_thresh is None:
+            legacy_silence_thresh = audio.dBFS - 14
+
+        ### split the audio into chunks based on silence, with a threshold estimated
+        ### from the loudness histogram of the current file (or of each window)
+        if silence_window:
+            audio_chunks, silence_thresh = split_on_adaptive_silence(audio,
+                                                                     min_silence_len=min_silence_len,
+                                                                     keep_silence=keep_silence,
+                                                                     window_sec=silence_window,
+                                                                     percentile=silence_percentile,
+                                                                     margin_db=silence_margin)
+        else:
+            silence_thresh = estimate_silence_threshold(audio, percentile=silence_percentile, margin_db=silence_margin)
+            audio_chunks = split_on_silence(audio, 
+                                            min_silence_len=min_silence_len, 
+                                            silence_thresh=silence_thresh, 
+                                            keep_silence=keep_silence)
+        print(f"Silence threshold: {silence_thresh:.1f} dBFS, {len(audio_chunks)} chunks")
+
+        ### compare with the chunks the legacy global threshold would have produced
+        if silence_report:
+            legacy_chunks = split_on_silence(audio,
+                                             min_silence_len=min_silence_len,
+                                             silence_thresh=legacy_silence_thresh,
+                                             keep_silence=keep_silence)
+            stats = summarize_chunks(audio_chunks, min_duration, max_duration)
+            legacy_stats = summarize_chunks(legacy_chunks, min_duration, max_duration)
+            report.append({"file": wav_file, "duration_sec": round(len(audio) / 1000.0, 2),
+                           "silence_thresh": round(silence_thresh, 1), **stats,
+                           "legacy_silence_thresh": round(legacy_silence_thresh, 1),
+                           **{f"legacy_{key}": value for key, value in legacy_stats.items()}})
+
+        ### files the duplicate chunks of the current file come from
+        checked_chunks = 0
+        duplicate_sources = Counter()
 
         ### transcribe each chunk and save with metadata
         for i, chunk in enumerate(audio_chunks):
@@ -84,6 +132,19 @@ def process_audio_files(input_dir, output_dir, min_duration=3, max_duration=15):
                 print(f"Skipping chunk {i} (Duration: {chunk_duration_sec:.2f} seconds)")
                 continue
 
+            ### check whether the chunk already appeared in another file (e.g. in a compilation)
+            if index is not None:
+                chunk_key = f"{wav_file}#{i}"
+                duplicate_of, similarity = index.check_and_add(chunk_key, chunk, group=wav_file)
+                checked_chunks += 1
+                if duplicate_of is not None:
+                    duplicate_sources[index.groups[duplicate_of]] += 1
+                    print(f"Chunk {i} is a near-duplicate of {duplicate_of} (similarity: {similarity:.2f})")
+                    duplicates.append({"item": chunk_key, "duplicate_of": duplicate_of,
+                                       "similarity": round(similarity, 3), "level": "chunk", "action": dedup_mode})
+                    if dedup_mode == "skip":
+                        continue
+
             ### convert chunk to mono if it's not
             chunk = chunk.set_channels(1)
 
@@ -127,6 +188,14 @@ def process_audio_files(input_dir, output_dir, min_duration=3, max_duration=15):
             ### remove temporary chunk file
             os.remove(chunk_path)
 
+        ### report the whole file when most of its chunks come from the same other file (e.g. a re-upload)
+        if duplicate_sources:
+            source, count = duplicate_sources.most_common(1)[0]
+            if count >= file_duplicate_ratio * checked_chunks:
+                print(f"{wav_file} is a near-duplicate of {source} ({count}/{checked_chunks} chunks)")
+                duplicates.append({"item": wav_file, "duplicate_of": source,
+                                   "similarity": round(count / checked_chunks, 3), "level": "file", "action": dedup_mode})
+
     ### create a metadata.csv file with sentences and corresponding audio file IDs
     metadata_df = pd.DataFrame(metadata)
     metadata_csv_path = os.path.join(output_dir, "metadata.csv")
@@ -135,6 +204,23 @@ def process_audio_files(input_dir, output_dir, min_duration=3, max_duration=15):
     print(f"Processed {len(metadata)} sentences.")
     print(f"CSV file saved to {metadata_csv_path}")
 
+    ### save the near-duplicates that were skipped or flagged
+    if index is not None:
+        duplicates_csv_path = os.path.join(output_dir, "duplicates.csv")
+        pd.DataFrame(duplicates, columns=["item", "duplicate_of", "similarity", "level", "action"]).to_csv(duplicates_csv_path, index=False)
+        print(f"Found {len(duplicates)} near-duplicates, report saved to {duplicates_csv_path}")
+
+    ### save the comparison of the adaptive and legacy silence thresholds
+    if silence_report:
+        report_df = pd.DataFrame(report)
+        report_df.to_csv(silence_report, index=False)
+        if not report_df.empty:
+            print(f"Adaptive threshold: {report_df['chunks'].sum()} chunks, {report_df['kept_chunks'].sum()} kept "
+                  f"({report_df['kept_sec'].sum():.0f} seconds)")
+            print(f"Legacy threshold:   {report_df['legacy_chunks'].sum()} chunks, {report_df['legacy_kept_chunks'].sum()} kept "
+                  f"({report_df['legacy_kept_sec'].sum():.0f} seconds)")
+        print(f"Silence threshold report saved to {silence_report}")
+
 
 
 ### function to handle CLI arguments
@@ -149,6 +235,20 @@ def parse_arguments():
     parser.add_argument("-o", "--output_dir", type=str, required=True, help="the directory to save chunked audio files and metadata")
     parser.add_argument("--min_duration", type=float, default=3, help="Minimum duration for audio chunks in seconds")
     parser.add_argument("--max_duration", type=float, default=15, help="Maximum duration for audio chunks in seconds")
+    parser.add_argument("--dedup_index", type=str, default=None,
+                        help="Path of the fingerprint index used to detect near-duplicate files and chunks (disabled if not set)")
+    parser.add_argument("--dedup_mode", type=str, choices=["skip", "flag"], default="skip",
+                        help="Skip near-duplicates before transcription, or only flag them in duplicates.csv (default: skip)")
+    parser.add_argument("--dedup_threshold", type=float, default=0.3,
+                        help="Minimum estimated similarity (0-1) for two chunks to count as near-duplicates (default: 0.3)")
+    parser.add_argument("--silence_percentile", type=float, default=10,
+                        help="Percentile of the frame loudness taken as noise floor (default: 10)")
+    parser.add_argument("--silence_margin", type=float, default=6,
+                        help="Distance in dB between the silence threshold and the noise floor (default: 6)")
+    parser.add_argument("--silence_window", type=float, default=0,
+                        help="Estimate the silence threshold per window of this many seconds instead of per file (default: 0, per file)")
+    parser.add_argument("--silence_report", type=str, default=None,
+                        help="Path of a CSV comparing chunk counts and kept seconds with the legacy global threshold (optional)")
     return parser.parse_args()
 
 
@@ -157,4 +257,7 @@ if __name__ == "__main__":
     args = parse_arguments()
 
     ### process the audio files in the specified input directory and save to output directory
-    process_audio_files(args.input_dir, args.output_dir, min_duration=args.min_duration, max_duration=args.max_duration)
\ No newline at end of file
+    process_audio_files(args.input_dir, args.output_dir, min_duration=args.min_duration, max_duration=args.max_duration,
+                        dedup_index=args.dedup_index, dedup_mode=args.dedup_mode, dedup_threshold=args.dedup_threshold,
+                        silence_percentile=args.silence_percentile, silence_margin=args.silence_margin,
+                        silence_window=args.silence_window, silence_report=args.silence_report)
\ No newline at end of file
@@ -0,0 +1,197 @@
+import numpy as np
+
+
+### parameters of the loudness histogram
+MIN_DBFS = -100.0  ### frames quieter than this fall in the first bin, digital silence is left out
+BIN_WIDTH_DB = 0.5
+NUM_BINS = int(-MIN_DBFS / BIN_WIDTH_DB)
+BLOCK_MS = 60000  ### audio is scanned in blocks of this length, so memory does not grow with the file
+
+
+### class accumulating frame loudness values into a fixed-size histogram
+class LoudnessHistogram:
+    """Fixed-size histogram of frame loudness (dBFS) that can be updated block by block.
+
+    Frames of digital silence (-inf dBFS) are not counted: a zero-filled intro or
+    outro would otherwise pull the noise floor far below the real pauses.
+    """
+
+    def __init__(self):
+        self.counts = np.zeros(NUM_BINS, dtype=np.int64)
+
+    def update(self, frame_dbfs):
+        """Add frame loudness values to the histogram.
+
+        Args:
+            frame_dbfs (np.ndarray): Loudness of each frame in dBFS.
+        """
+        frame_dbfs = frame_dbfs[np.isfinite(frame_dbfs)]
+        bins = ((np.clip(frame_dbfs, MIN_DBFS, 0.0) - MIN_DBFS) / BIN_WIDTH_DB).astype(np.int64)
+        self.counts += np.bincount(np.minimum(bins, NUM_BINS - 1), minlength=NUM_BINS)
+
+    def percentile(self, q):
+        """Return the loudness (dBFS) below which `q` percent of the frames fall.
+
+        Args:
+            q (float): The percentile, between 0 and 100.
+
+        Returns:
+            float: The loudness in dBFS, or MIN_DBFS if the histogram is empty.
+        """
+        total = self.counts.sum()
+        if total == 0:
+            return MIN_DBFS
+        index = int(np.searchsorted(np.cumsum(self.counts), q / 100.0 * total))
+        return MIN_DBFS + (min(index, NUM_BINS - 1) + 0.5) * BIN_WIDTH_DB
+
+
+### function to compute the number of samples (per channel) in a loudness frame
+def _samples_per_frame(audio, frame_ms):
+    return max(1, int(audio.frame_rate * frame_ms / 1000))
+
+
+### function to compute the loudness of fixed-length frames, one block at a time
+def iter_frame_loudness(audio, frame_ms=10, block_ms=BLOCK_MS):
+    """Yield the loudness (dBFS) of consecutive `frame_ms` frames of an audio segment.
+
+    The segment is scanned in blocks of about `block_ms`, so only one block of
+    samples is converted to numpy at a time.
+
+    Args:
+        audio (AudioSegment): The audio to scan.
+        frame_ms (int): Length of each frame in milliseconds.
+        block_ms (int): Length of each block in milliseconds.
+
+    Yields:
+        np.ndarray: The loudness of the frames of each block.
+    """
+    samples_per_frame = _samples_per_frame(audio, frame_ms)
+    samples_per_block = samples_per_frame * max(1, block_ms // frame_ms)
+    total_samples = int(audio.frame_count())
+    for start in range(0, total_samples, samples_per_block):
+        block = audio.get_sample_slice(start, min(start + samples_per_block, total_samples))
+        samples = np.array(block.get_array_of_samples(), dtype=np.float64)
+        num_frames = int(np.ceil(len(samples) / (samples_per_frame * audio.channels)))
+        samples = np.pad(samples, (0, num_frames * samples_per_frame * audio.channels - len(samples)))
+        rms = np.sqrt(np.mean(samples.reshape(num_frames, -1) ** 2, axis=1))
+        with np.errstate(divide="ignore"):
+            yield 20 * np.log10(rms / audio.max_possible_amplitude)
+
+
+### function to turn a loudness histogram into a silence threshold
+def threshold_from_histogram(histogram, percentile=10, margin_db=6):
+    """Place the silence threshold `margin_db` above the noise floor, but below the speech level.
+
+    Args:
+        histogram (LoudnessHistogram): Loudness of the frames to consider.
+        percentile (float): Percentile of the frame loudness taken as noise floor.
+        margin_db (float): Distance (in dB) between the threshold and the noise floor.
+
+    Returns:
+        float: The silence threshold in dBFS.
+    """
+    noise_floor = histogram.percentile(percentile)
+    speech_level = histogram.percentile(100 - percentile)
+    ### files without real pauses have a noise floor close to the speech level
+    return min(noise_floor + margin_db, (noise_floor + speech_level) / 2)
+
+
+### function to estimate one silence threshold for a whole audio segment
+def estimate_silence_threshold(audio, percentile=10, margin_db=6, frame_ms=10):
+    """Estimate the silence threshold of an audio segment from its loudness histogram.
+
+    Args:
+        audio (AudioSegment): The audio to analyse.
+        percentile (float): Percentile of the frame loudness taken as noise floor.
+        margin_db (float): Distance (in dB) between the threshold and the noise floor.
+        frame_ms (int): Length of the frames used for the histogram, in milliseconds.
+
+    Returns:
+        float: The silence threshold in dBFS.
+    """
+    histogram = LoudnessHistogram()
+    for frame_dbfs in iter_frame_loudness(audio, frame_ms):
+        histogram.update(frame_dbfs)
+    return threshold_from_histogram(histogram, percentile, margin_db)
+
+
+### function to split an audio segment on silence with a threshold that follows the recording
+def split_on_adaptive_silence(audio, min_silence_len=500, keep_silence=200, window_sec=60,
+                              percentile=10, margin_db=6, frame_ms=10):
+    """Split an audio segment on silence, estimating the threshold per sliding window.
+
+    A threshold is estimated for each `window_sec` window and linearly
+    interpolated between window centres, so recordings whose level or noise
+    floor drifts are still split where the pauses are. Chunks are padded with
+    `keep_silence` like `pydub.silence.split_on_silence`.
+
+    Args:
+        audio (AudioSegment): The audio to split.
+        min_silence_len (int): Minimum length of silence (in ms) to be used for a split.
+        keep_silence (int): Amount of silence (in ms) to leave at the beginning and end of each chunk.
+        window_sec (float): Length of the windows the threshold is estimated on, in seconds.
+        percentile (float): Percentile of the frame loudness taken as noise floor.
+        margin_db (float): Distance (in dB) between the threshold and the noise floor.
+        frame_ms (int): Length of the frames used for the loudness analysis, in milliseconds.
+
+    Returns:
+        tuple: (list of AudioSegment chunks, mean silence threshold in dBFS)
+    """
+    frame_dbfs = np.concatenate(list(iter_frame_loudness(audio, frame_ms)) or [np.array([])])
+    if len(frame_dbfs) == 0:
+        return [], MIN_DBFS
+
+    ### exact frame duration, since frame_ms may not be a whole number of samples
+    frame_duration_ms = _samples_per_frame(audio, frame_ms) * 1000 / audio.frame_rate
+
+    ### estimate one threshold per window, then interpolate between window centres
+    frames_per_window = max(1, int(window_sec * 1000 / frame_duration_ms))
+    centres, thresholds = [], []
+    for start in range(0, len(frame_dbfs), frames_per_window):
+        histogram = LoudnessHistogram()
+        histogram.update(frame_dbfs[start:start + frames_per_window])
+        centres.append(start + min(frames_per_window, len(frame_dbfs) - start) / 2)
+        thresholds.append(threshold_from_histogram(histogram, percentile, margin_db))
+    frame_thresholds = np.interp(np.arange(len(frame_dbfs)), centres, thresholds)
+
+    ### find the runs of silent frames that are long enough to split on
+    silent = np.concatenate(([False], frame_dbfs < frame_thresholds, [False]))
+    edges = np.flatnonzero(np.diff(silent.astype(np.int8)))
+    run_starts, run_ends = edges[::2], edges[1::2]
+    long_enough = (run_ends - run_starts) * frame_duration_ms >= min_silence_len
+    silence_starts = np.round(run_starts[long_enough] * frame_duration_ms).astype(np.int64)
+    silence_ends = np.minimum(np.round(run_ends[long_enough] * frame_duration_ms).astype(np.int64), len(audio))
+    silences = zip(silence_starts.tolist(), silence_ends.tolist())
+
+    ### the non-silent ranges in between become chunks, padded with keep_silence
+    ranges, previous_end = [], 0
+    for silence_start, silence_end in silences:
+        if silence_start > previous_end:
+            ranges.append([previous_end - keep_silence, silence_start + keep_silence])
+        previous_end = silence_end
+    if previous_end < len(audio):
+        ranges.append([previous_end - keep_silence, len(audio) + keep_silence])
+
+    ### when the padding of two chunks overlaps, split it in the middle
+    for current, following in zip(ranges, ranges[1:]):
+        if following[0] < current[1]:
+            current[1] = following[0] = (current[1] + following[0]) // 2
+
+    chunks = [audio[max(start, 0):min(end, len(audio))] for start, end in ranges]
+    return chunks, float(np.mean(thresholds))
+
+
+### function to summarize how many chunks and seconds survive the duration filter
+def summarize_chunks(chunks, min_duration, max_duration):
+    """Count the chunks of a split and the ones kept by the duration filter.
+
+    Args:
+        chunks (list): The AudioSegment chunks.
+        min_duration (float): Minimum duration for audio chunks in seconds.
+        max_duration (float): Maximum duration for audio chunks in seconds.
+
+    Returns:
+        dict: Number of chunks, number of kept chunks and kept duration in seconds.
+    """
+    kept = [len(chunk) / 1000.0 for chunk in chunks if min_duration <= len(chunk) / 1000.0 <= max_duration]
+    return {"chunks": len(chunks), "kept_chunks": len(kept), "kept_sec": round(sum(kept), 2)}
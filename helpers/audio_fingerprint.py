@@ -0,0 +1,298 @@
+import json
+import os
+
+import numpy as np
+
+
+### parameters of the spectral fingerprint
+FINGERPRINT_VERSION = 2  ### stored in the index header, bump when the hashes below change
+FINGERPRINT_SAMPLE_RATE = 8000  ### audio is resampled to this rate before hashing
+FRAME_SIZE = 1024  ### samples per analysis frame (128 ms at 8 kHz)
+HOP_SIZE = 128  ### samples between frames (16 ms at 8 kHz)
+NUM_BANDS = 64  ### log-spaced bands between MIN_FREQ and MAX_FREQ, peaks are picked on this grid
+MIN_FREQ = 200
+MAX_FREQ = 3800
+PEAK_BAND_RADIUS = 5  ### a peak is the maximum of +/- this many bands...
+PEAK_FRAME_RADIUS = 10  ### ...and +/- this many frames
+PEAK_MIN_ABOVE_MEDIAN = 1.0  ### peaks must be 10 dB above the median band energy (log10 units)
+PEAKS_PER_SECOND = 30  ### a peak is dropped when this many stronger peaks lie within half a second of it
+FAN_OUT = 5  ### number of following peaks each peak is paired with
+MAX_DELTA_FRAMES = 127  ### maximum distance (in frames) between the two peaks of a landmark
+DELTA_TOLERANCE = 1  ### each landmark is also hashed with its distance +/- this many frames
+FRAMES_PER_BLOCK = 4096  ### frames processed per FFT batch to bound memory on long segments
+CODE_PRIME = 4294967311  ### smallest prime above 2**32, used by the MinHash permutations
+
+
+### function to turn a pydub AudioSegment into mono float samples at the fingerprint rate
+def _segment_to_samples(segment):
+    """Convert an AudioSegment into mono float32 samples at FINGERPRINT_SAMPLE_RATE.
+
+    The resampling is done in the frequency domain, so copies of the same audio
+    at different sample rates end up with the same band-limited signal.
+
+    Args:
+        segment (AudioSegment): The audio to convert.
+
+    Returns:
+        np.ndarray: The mono samples.
+    """
+    segment = segment.set_channels(1)
+    samples = np.array(segment.get_array_of_samples(), dtype=np.float64)
+    num_samples = int(round(len(samples) * FINGERPRINT_SAMPLE_RATE / segment.frame_rate))
+    if num_samples == 0:
+        return np.array([], dtype=np.float32)
+    spectrum = np.fft.rfft(samples)[:num_samples // 2 + 1]
+    return (np.fft.irfft(spectrum, num_samples) * num_samples / len(samples)).astype(np.float32)
+
+
+### function to compute the band edges (in FFT bins) used by the spectrogram
+def _band_edges():
+    """Return the FFT bin index of each band edge, log-spaced between MIN_FREQ and MAX_FREQ."""
+    freqs = np.geomspace(MIN_FREQ, MAX_FREQ, NUM_BANDS + 1)
+    edges = np.round(freqs * FRAME_SIZE / FINGERPRINT_SAMPLE_RATE).astype(np.int64)
+    ### make sure every band covers at least one bin
+    return np.maximum(edges, np.arange(len(edges)) + edges[0])
+
+
+### function to compute the log band energies of an audio segment
+def _band_spectrogram(samples):
+    """Compute the log energy of each band for each analysis frame.
+
+    Args:
+        samples (np.ndarray): Mono samples at FINGERPRINT_SAMPLE_RATE.
+
+    Returns:
+        np.ndarray: Array of shape (num_frames, NUM_BANDS).
+    """
+    num_frames = 1 + (len(samples) - FRAME_SIZE) // HOP_SIZE
+    window = np.hanning(FRAME_SIZE).astype(np.float32)
+    edges = _band_edges()
+    frames_view = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)
+
+    energies = np.empty((num_frames, NUM_BANDS), dtype=np.float32)
+    for start in range(0, num_frames, FRAMES_PER_BLOCK):
+        stop = min(start + FRAMES_PER_BLOCK, num_frames)
+        frames = frames_view[start * HOP_SIZE:(stop - 1) * HOP_SIZE + 1:HOP_SIZE]
+        spectrum = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2
+        cumulative = np.cumsum(spectrum, axis=1)
+        energies[start:stop] = cumulative[:, edges[1:] - 1] - cumulative[:, edges[:-1] - 1]
+    return np.log10(energies + 1e-3)
+
+
+### function to find the spectral peaks of a band spectrogram
+def _find_peaks(spectrogram):
+    """Find local maxima of the spectrogram, dropping the weakest ones in dense regions.
+
+    Both the local maxima and the density limit are computed on windows centred
+    on each peak, so the peaks do not depend on where the segment starts.
+
+    Args:
+        spectrogram (np.ndarray): Log band energies of shape (num_frames, NUM_BANDS).
+
+    Returns:
+        tuple: (frames, bands) of the peaks, sorted by frame.
+    """
+    padded = np.pad(spectrogram, ((PEAK_FRAME_RADIUS, PEAK_FRAME_RADIUS), (PEAK_BAND_RADIUS, PEAK_BAND_RADIUS)),
+                    mode="constant", constant_values=-np.inf)
+    ### separable maximum filter: over bands, then over frames
+    local_max = np.lib.stride_tricks.sliding_window_view(padded, 2 * PEAK_BAND_RADIUS + 1, axis=1).max(axis=-1)
+    local_max = np.lib.stride_tricks.sliding_window_view(local_max, 2 * PEAK_FRAME_RADIUS + 1, axis=0).max(axis=-1)
+
+    floor = np.median(spectrogram) + PEAK_MIN_ABOVE_MEDIAN
+    frames, bands = np.nonzero((spectrogram >= local_max) & (spectrogram > floor))
+    strengths = spectrogram[frames, bands]
+
+    ### keep a peak only if fewer than PEAKS_PER_SECOND stronger peaks lie within half a second of it
+    half_window = FINGERPRINT_SAMPLE_RATE // (2 * HOP_SIZE)
+    window_starts = np.searchsorted(frames, frames - half_window, side="left")
+    window_ends = np.searchsorted(frames, frames + half_window, side="right")
+    keep = np.array([np.count_nonzero(strengths[window_start:window_end] > strength) < PEAKS_PER_SECOND
+                     for window_start, window_end, strength in zip(window_starts, window_ends, strengths)],
+                    dtype=bool)
+    return frames[keep], bands[keep]
+
+
+### function to compute the landmark hashes of an audio segment
+def compute_landmark_hashes(segment):
+    """Compute the set of spectral landmark hashes of an audio segment.
+
+    A landmark pairs a spectral peak with one of the next peaks and hashes
+    (band of the first peak, band of the second peak, frame distance). Each
+    landmark is also hashed with its distance +/- DELTA_TOLERANCE frames, since
+    a copy that starts at a different offset falls on a different frame grid.
+    Landmarks are insensitive to gain, robust to background noise, and do not
+    depend on where the segment starts.
+
+    The number of distinct hashes is bounded, so long segments share more of
+    them by chance: fingerprint chunks of sentence length, not whole recordings.
+
+    Args:
+        segment (AudioSegment): The audio to fingerprint.
+
+    Returns:
+        np.ndarray: The unique landmark hashes (uint64).
+    """
+    samples = _segment_to_samples(segment)
+    if len(samples) < FRAME_SIZE + HOP_SIZE:
+        return np.array([], dtype=np.uint64)
+
+    frames, bands = _find_peaks(_band_spectrogram(samples))
+
+    hashes = [np.array([], dtype=np.int64)]
+    for offset in range(1, FAN_OUT + 1):
+        delta = frames[offset:] - frames[:-offset]
+        valid = (delta > 0) & (delta <= MAX_DELTA_FRAMES)
+        band_pairs = bands[:-offset][valid] * NUM_BANDS + bands[offset:][valid]
+        for jitter in range(-DELTA_TOLERANCE, DELTA_TOLERANCE + 1):
+            hashes.append(band_pairs * (MAX_DELTA_FRAMES + 2 * DELTA_TOLERANCE + 1) + delta[valid] + jitter + DELTA_TOLERANCE)
+    return np.unique(np.concatenate(hashes).astype(np.uint64))
+
+
+### class holding the MinHash signatures and the banded LSH buckets
+class FingerprintIndex:
+    """Index of MinHash signatures supporting approximate near-duplicate lookup.
+
+    Signatures are split into `num_bands` bands of `rows_per_band` values; two
+    items become candidates when any band matches exactly, and candidates are
+    confirmed by their estimated Jaccard similarity. Lookups therefore touch
+    only the matching buckets instead of every stored item.
+
+    Each item belongs to a group (e.g. the file a chunk was cut from), and
+    matches within the same group are ignored, so repeated passages of one
+    recording are not reported as duplicates of each other.
+
+    The index is persisted as JSON lines: a header describing the hashing
+    parameters, then one line per added item, appended as items are added.
+    """
+
+    def __init__(self, path=None, num_bands=32, rows_per_band=2, threshold=0.3, seed=0):
+        """Create an index, loading existing entries from `path` if it exists.
+
+        Args:
+            path (str): The JSON lines file backing the index (optional, in-memory if None).
+            num_bands (int): Number of LSH bands.
+            rows_per_band (int): Number of signature values per band.
+            threshold (float): Minimum estimated Jaccard similarity to report a duplicate.
+            seed (int): Seed of the MinHash permutations.
+        """
+        self.path = path
+        self.num_bands = num_bands
+        self.rows_per_band = rows_per_band
+        self.threshold = threshold
+        self.seed = seed
+        self.signatures = {}
+        self.groups = {}
+        self.buckets = [{} for _ in range(num_bands)]
+
+        num_perm = num_bands * rows_per_band
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, CODE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, CODE_PRIME, size=num_perm, dtype=np.uint64)
+
+        if path and os.path.exists(path):
+            self._load()
+
+    def _header(self):
+        return {"version": FINGERPRINT_VERSION, "num_bands": self.num_bands,
+                "rows_per_band": self.rows_per_band, "seed": self.seed}
+
+    def _load(self):
+        """Load the entries of the backing file and rebuild the buckets."""
+        with open(self.path, "r") as f:
+            header = json.loads(f.readline())
+            if header != self._header():
+                raise ValueError(f"Fingerprint index {self.path} was built with {header}, expected {self._header()}")
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._insert(entry["key"], np.array(entry["signature"], dtype=np.uint64), entry.get("group"))
+
+    def signature(self, hashes):
+        """Compute the MinHash signature of a set of landmark hashes.
+
+        Args:
+            hashes (np.ndarray): The landmark hashes, as returned by `compute_landmark_hashes`.
+
+        Returns:
+            np.ndarray: The signature, or None if there are no hashes.
+        """
+        if len(hashes) == 0:
+            return None
+        hashed = (np.outer(self._a, hashes) + self._b[:, None]) % CODE_PRIME
+        return hashed.min(axis=1)
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows_per_band:(i + 1) * self.rows_per_band].tobytes() for i in range(self.num_bands)]
+
+    def _insert(self, key, signature, group):
+        self.signatures[key] = signature
+        self.groups[key] = group
+        for band, band_key in zip(self.buckets, self._band_keys(signature)):
+            band.setdefault(band_key, []).append(key)
+
+    def query(self, signature, group=None):
+        """Find the most similar stored item outside of `group`.
+
+        Args:
+            signature (np.ndarray): The signature to look up.
+            group (str): Group of the item being looked up, whose members are never reported (optional).
+
+        Returns:
+            tuple: (key, similarity) of the best match above the threshold, or (None, 0.0).
+        """
+        if signature is None:
+            return None, 0.0
+        candidates = set()
+        for band, band_key in zip(self.buckets, self._band_keys(signature)):
+            candidates.update(band.get(band_key, ()))
+
+        best_key, best_similarity = None, 0.0
+        for key in candidates:
+            if group is not None and self.groups[key] == group:
+                continue
+            similarity = float(np.mean(self.signatures[key] == signature))
+            if similarity > best_similarity:
+                best_key, best_similarity = key, similarity
+        if best_similarity < self.threshold:
+            return None, 0.0
+        return best_key, best_similarity
+
+    def add(self, key, signature, group=None):
+        """Add a signature to the index and append it to the backing file.
+
+        Args:
+            key (str): Identifier of the item (e.g. a chunk ID).
+            signature (np.ndarray): The signature to store.
+            group (str): Group of the item, e.g. the file it was cut from (optional).
+        """
+        if signature is None:
+            return
+        self._insert(key, signature, group)
+        if self.path:
+            is_new = not os.path.exists(self.path)
+            with open(self.path, "a") as f:
+                if is_new:
+                    f.write(json.dumps(self._header()) + "\n")
+                f.write(json.dumps({"key": key, "group": group, "signature": signature.tolist()}) + "\n")
+
+    def check_and_add(self, key, segment, group=None):
+        """Fingerprint a segment, look it up, and add it when it is not a duplicate.
+
+        Items already stored under `key` (e.g. by a previous run on the same
+        index) are treated as already processed, not as duplicates.
+
+        Args:
+            key (str): Identifier of the item.
+            segment (AudioSegment): The audio to fingerprint.
+            group (str): Group of the item, e.g. the file it was cut from (optional).
+
+        Returns:
+            tuple: (duplicate_of, similarity); duplicate_of is None for new or already stored items.
+        """
+        if key in self.signatures:
+            return None, 0.0
+        signature = self.signature(compute_landmark_hashes(segment))
+        duplicate_of, similarity = self.query(signature, group)
+        if duplicate_of is None:
+            self.add(key, signature, group)
+        return duplicate_of, similarity
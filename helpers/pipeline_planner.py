@@ -0,0 +1,314 @@
+import glob
+import os
+import random
+import struct
+import tempfile
+import time
+import wave
+
+import pandas as pd
+from pydub import AudioSegment
+from pydub.silence import split_on_silence
+
+from helpers.adaptive_silence import estimate_silence_threshold, split_on_adaptive_silence
+from helpers.audio_fingerprint import FingerprintIndex
+
+
+HF_SAMPLE_RATE = 16000  ### sample rate of the audio column of the Hugging Face dataset
+HF_SAMPLE_WIDTH = 2
+WAV_HEADER_BYTES = 44
+METADATA_BENCHMARK_ROWS = 10000  ### rows of the metadata.csv written once to measure the cost per row
+
+
+### function to read the format of a WAV file from its RIFF chunks, for files the wave module rejects
+def _read_riff_header(wav_file):
+    """Read the sample rate, channels, sample width and frame count from the `fmt ` and `data` chunks.
+
+    Unlike the wave module, this accepts any format tag, including WAVE_FORMAT_EXTENSIBLE.
+
+    Args:
+        wav_file (str): Path of the WAV file.
+
+    Returns:
+        tuple: (frame_rate, channels, sample_width, num_frames)
+
+    Raises:
+        ValueError: If the file is not a RIFF/WAVE file or has no `fmt ` or `data` chunk.
+    """
+    with open(wav_file, "rb") as f:
+        riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise ValueError("not a RIFF/WAVE file")
+        fmt, data_size = None, None
+        while fmt is None or data_size is None:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                raise ValueError("missing fmt or data chunk")
+            chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+            if chunk_id == b"fmt ":
+                if chunk_size < 16:
+                    raise ValueError("fmt chunk too short")
+                fmt = struct.unpack("<HHIIHH", f.read(16))
+                f.seek(chunk_size - 16 + chunk_size % 2, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                ### streamed files leave the data size unset, the data then runs to the end of the file
+                data_size = min(chunk_size, os.path.getsize(wav_file) - f.tell())
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+            else:
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+    _, channels, frame_rate, _, _, bits_per_sample = fmt
+    sample_width = (bits_per_sample + 7) // 8
+    if channels == 0 or sample_width == 0:
+        raise ValueError("invalid fmt chunk")
+    return frame_rate, channels, sample_width, data_size // (channels * sample_width)
+
+
+### function to read the duration and format of WAV files without decoding them
+def read_wav_headers(input_dir):
+    """Read the header of every WAV file in a directory.
+
+    Args:
+        input_dir (str): The directory containing the WAV files.
+
+    Returns:
+        list: One dict per readable file with its path, duration, sample rate, channels and sample width.
+    """
+    headers = []
+    for wav_file in sorted(glob.glob(os.path.join(input_dir, "*.wav"))):
+        try:
+            with wave.open(wav_file, "rb") as f:
+                frame_rate, channels, sample_width, num_frames = (f.getframerate(), f.getnchannels(),
+                                                                  f.getsampwidth(), f.getnframes())
+        except (wave.Error, EOFError):
+            ### wave only reads plain PCM (and not WAVE_FORMAT_EXTENSIBLE before Python 3.12)
+            try:
+                frame_rate, channels, sample_width, num_frames = _read_riff_header(wav_file)
+            except (ValueError, struct.error) as e:
+                print(f"Could not read the header of {wav_file}: {e}")
+                continue
+        if frame_rate == 0:
+            print(f"Skipping {wav_file}: its header has a sample rate of 0")
+            continue
+        headers.append({
+            "path": wav_file,
+            "duration_sec": num_frames / frame_rate,
+            "frame_rate": frame_rate,
+            "channels": channels,
+            "sample_width": sample_width,
+        })
+    return headers
+
+
+### function to load the ASR pipeline used to measure transcription throughput
+def _load_asr_pipeline(model):
+    import torch
+    from transformers import pipeline
+
+    device = 0 if torch.cuda.is_available() else "cpu"
+    return pipeline(task="automatic-speech-recognition", model=model, device=device, return_timestamps=True)
+
+
+### function to run the pipeline stages on a few files and time them
+def measure_sample(headers, min_duration, max_duration, silence_percentile=10, silence_margin=6, silence_window=0,
+                   dedup=False, asr_chunks=0, asr_model=None, seed=0, min_silence_len=500, keep_silence=200):
+    """Run decoding, fingerprinting, segmentation, export and optionally ASR on sampled files.
+
+    Each stage mirrors create-ljspeech.py: kept chunks are exported twice (the
+    temporary chunk sent to ASR and the final LJxxxx.wav), and metadata.csv is
+    rewritten after every chunk.
+
+    Args:
+        headers (list): Headers of the sampled files, as returned by `read_wav_headers`.
+        min_duration (float): Minimum duration for audio chunks in seconds.
+        max_duration (float): Maximum duration for audio chunks in seconds.
+        silence_percentile (float): Percentile of the frame loudness taken as noise floor.
+        silence_margin (float): Distance (in dB) between the silence threshold and the noise floor.
+        silence_window (float): Window (in seconds) of the silence threshold, 0 for one threshold per file.
+        dedup (bool): Whether near-duplicate detection is enabled.
+        asr_chunks (int): Number of kept chunks to transcribe to measure ASR throughput (0 to skip).
+        asr_model (str): The ASR model used by the pipeline.
+        seed (int): Seed of the random chunk sample transcribed to measure ASR throughput.
+        min_silence_len (int): Minimum length of silence (in ms) to be used for a split.
+        keep_silence (int): Amount of silence (in ms) to leave at the beginning and end of each chunk.
+
+    Returns:
+        dict: Audio seconds, chunk counts, kept seconds, and seconds spent in each stage.
+    """
+    measured = {"audio_sec": 0.0, "chunks": 0, "kept_chunks": 0, "kept_sec": 0.0,
+                "decode": 0.0, "segmentation": 0.0, "export": 0.0}
+    metadata = []
+    metadata_times = []
+    index = FingerprintIndex() if dedup else None
+    if dedup:
+        measured["fingerprint"] = 0.0
+    kept_paths = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for header in headers:
+            print(f"--> Sampling {header['path']}")
+            start = time.perf_counter()
+            audio = AudioSegment.from_wav(header["path"])
+            measured["decode"] += time.perf_counter() - start
+            measured["audio_sec"] += len(audio) / 1000.0
+
+            start = time.perf_counter()
+            if silence_window:
+                chunks, _ = split_on_adaptive_silence(audio, min_silence_len=min_silence_len, keep_silence=keep_silence,
+                                                      window_sec=silence_window, percentile=silence_percentile,
+                                                      margin_db=silence_margin)
+            else:
+                silence_thresh = estimate_silence_threshold(audio, percentile=silence_percentile, margin_db=silence_margin)
+                chunks = split_on_silence(audio, min_silence_len=min_silence_len, silence_thresh=silence_thresh,
+                                          keep_silence=keep_silence)
+            measured["segmentation"] += time.perf_counter() - start
+
+            measured["chunks"] += len(chunks)
+            for i, chunk in enumerate(chunks):
+                if not min_duration <= len(chunk) / 1000.0 <= max_duration:
+                    continue
+                measured["kept_chunks"] += 1
+                measured["kept_sec"] += len(chunk) / 1000.0
+
+                if index is not None:
+                    start = time.perf_counter()
+                    index.check_and_add(f"{header['path']}#{i}", chunk, group=header["path"])
+                    measured["fingerprint"] += time.perf_counter() - start
+
+                start = time.perf_counter()
+                chunk = chunk.set_channels(1)
+                chunk_path = os.path.join(tmp_dir, f"chunk_{len(kept_paths)}.wav")
+                chunk.export(chunk_path, format="wav")
+                chunk.export(os.path.join(tmp_dir, "sentence.wav"), format="wav")
+                measured["export"] += time.perf_counter() - start
+                kept_paths.append((chunk_path, len(chunk) / 1000.0))
+
+                start = time.perf_counter()
+                metadata.append({"ID": f"LJ{str(len(metadata) + 1).zfill(4)}", "text": "", "textCleaned": ""})
+                pd.DataFrame(metadata).to_csv(os.path.join(tmp_dir, "metadata.csv"), sep="|", header=False, index=False)
+                metadata_times.append(time.perf_counter() - start)
+
+        ### metadata.csv rewrites cost a fixed time plus a time per row already written
+        if metadata_times:
+            rows = [{"ID": f"LJ{str(i + 1).zfill(4)}", "text": "", "textCleaned": ""} for i in range(METADATA_BENCHMARK_ROWS)]
+            start = time.perf_counter()
+            pd.DataFrame(rows).to_csv(os.path.join(tmp_dir, "metadata.csv"), sep="|", header=False, index=False)
+            benchmark = time.perf_counter() - start
+            measured["metadata_write"] = float(sorted(metadata_times)[len(metadata_times) // 2])
+            measured["metadata_per_row"] = max(0.0, (benchmark - measured["metadata_write"]) / METADATA_BENCHMARK_ROWS)
+
+        ### ASR throughput, as compute seconds per second of kept audio
+        if asr_chunks and kept_paths:
+            start = time.perf_counter()
+            pipe = _load_asr_pipeline(asr_model)
+            measured["asr_load"] = time.perf_counter() - start
+            asr_sample = random.Random(seed).sample(kept_paths, min(asr_chunks, len(kept_paths)))
+            start = time.perf_counter()
+            for chunk_path, _ in asr_sample:
+                pipe(chunk_path)
+            measured["asr_per_sec"] = (time.perf_counter() - start) / sum(duration for _, duration in asr_sample)
+
+    return measured
+
+
+### function to extrapolate the sample measurements to the whole corpus
+def estimate_corpus(headers, measured):
+    """Scale the sampled counts and stage timings to the total audio duration.
+
+    Args:
+        headers (list): Headers of all the files, as returned by `read_wav_headers`.
+        measured (dict): Measurements on the sampled files, as returned by `measure_sample`.
+
+    Returns:
+        dict: Expected chunks, kept chunks, kept seconds, disk usage (bytes) and per-stage runtime (seconds).
+    """
+    total_sec = sum(header["duration_sec"] for header in headers)
+    scale = total_sec / measured["audio_sec"] if measured["audio_sec"] else 0.0
+    kept_ratio = measured["kept_sec"] / measured["audio_sec"] if measured["audio_sec"] else 0.0
+    kept_chunks = measured["kept_chunks"] * scale
+
+    ### chunks are exported as mono with the sample rate and width of their source file
+    chunk_bytes = sum(header["duration_sec"] * kept_ratio * header["frame_rate"] * header["sample_width"]
+                      for header in headers) + kept_chunks * WAV_HEADER_BYTES
+
+    runtime = {stage: measured[stage] * scale for stage in ("decode", "fingerprint", "segmentation", "export")
+               if stage in measured}
+    if "metadata_write" in measured:
+        ### metadata.csv is rewritten after every chunk, with one more row each time
+        runtime["metadata"] = (measured["metadata_write"] * kept_chunks
+                               + measured["metadata_per_row"] * kept_chunks * (kept_chunks + 1) / 2)
+    if "asr_per_sec" in measured:
+        ### create-ljspeech.py builds the ASR pipeline again for every chunk
+        runtime["asr"] = (measured["asr_load"] + measured["asr_per_sec"] * measured["kept_sec"] / measured["kept_chunks"]) * kept_chunks
+
+    return {
+        "audio_sec": total_sec,
+        "chunks": measured["chunks"] * scale,
+        "kept_chunks": kept_chunks,
+        "kept_sec": measured["kept_sec"] * scale,
+        "chunk_bytes": chunk_bytes,
+        "hf_bytes": measured["kept_sec"] * scale * HF_SAMPLE_RATE * HF_SAMPLE_WIDTH,
+        "runtime": runtime,
+    }
+
+
+### function to print the plan of a pipeline run
+def plan_pipeline(input_dir, min_duration, max_duration, sample_size=3, seed=0, silence_percentile=10,
+                  silence_margin=6, silence_window=0, dedup=False, asr_chunks=0, asr_model=None):
+    """Print the expected size and per-stage runtime of a pipeline run without running it.
+
+    Only the WAV headers are read, unless `sample_size` is positive, in which case
+    that many random files are segmented to measure the chunk rate and the
+    throughput of each stage on this machine.
+
+    Args:
+        input_dir (str): The directory containing the input WAV files.
+        min_duration (float): Minimum duration for audio chunks in seconds.
+        max_duration (float): Maximum duration for audio chunks in seconds.
+        sample_size (int): Number of random files to segment (0 to only read headers).
+        seed (int): Seed of the random file sample.
+        silence_percentile (float): Percentile of the frame loudness taken as noise floor.
+        silence_margin (float): Distance (in dB) between the silence threshold and the noise floor.
+        silence_window (float): Window (in seconds) of the silence threshold, 0 for one threshold per file.
+        dedup (bool): Whether near-duplicate detection is enabled.
+        asr_chunks (int): Number of kept chunks to transcribe to measure ASR throughput (0 to skip).
+        asr_model (str): The ASR model used by the pipeline.
+    """
+    headers = read_wav_headers(input_dir)
+    total_sec = sum(header["duration_sec"] for header in headers)
+    wav_bytes = sum(os.path.getsize(header["path"]) for header in headers)
+
+    print(f"\n ================   Plan for {input_dir}   ================ \n")
+    print(f"WAV files:            {len(headers)}")
+    print(f"Audio:                {total_sec:.0f} s")
+    print(f"Input size:           {wav_bytes / 1e6:.1f} MB")
+
+    if not headers:
+        print(f"\nNo WAV files found in {input_dir}.")
+        return
+    if sample_size <= 0:
+        print("\nRun with --plan_sample N to segment N random files and estimate chunks and runtime.")
+        return
+
+    sample = random.Random(seed).sample(headers, min(sample_size, len(headers)))
+    measured = measure_sample(sample, min_duration, max_duration, silence_percentile=silence_percentile,
+                              silence_margin=silence_margin, silence_window=silence_window, dedup=dedup,
+                              asr_chunks=asr_chunks, asr_model=asr_model, seed=seed)
+    estimate = estimate_corpus(headers, measured)
+
+    print(f"\nSampled:              {len(sample)} files, {measured['audio_sec']:.0f} s of audio")
+    print(f"Expected chunks:      {estimate['chunks']:.0f}")
+    print(f"Expected kept chunks: {estimate['kept_chunks']:.0f} ({min_duration}-{max_duration} s)")
+    print(f"Expected kept audio:  {estimate['kept_sec']:.0f} s")
+    print(f"Chunk WAVs:           {estimate['chunk_bytes'] / 1e6:.1f} MB")
+    print(f"Dataset audio:        {estimate['hf_bytes'] / 1e6:.1f} MB (16 kHz, 16 bit)")
+
+    print("\nExpected runtime per stage (seconds):")
+    for stage, seconds in estimate["runtime"].items():
+        print(f"  {stage:<20}{seconds:>12.1f}")
+    if "asr" not in estimate["runtime"]:
+        print(f"  {'asr':<20}{'n/a':>12}   (run with --plan_asr_chunks N to measure it)")
+    print(f"  {'hf_dataset + push':<20}{'n/a':>12}   (not measured, depends on upload bandwidth)")
+    excluded = "the Hugging Face dataset and push" if "asr" in estimate["runtime"] else "ASR and the Hugging Face dataset and push"
+    print(f"  {'total':<20}{sum(estimate['runtime'].values()):>12.1f}   (without {excluded})")
+    if dedup:
+        print("Near-duplicates skipped during the run will lower the ASR time.")
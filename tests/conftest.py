@@ -0,0 +1,45 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from pydub import AudioSegment
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+SAMPLE_RATE = 16000
+
+
+### function to synthesize speech-like audio: voiced syllables with gliding pitch and random formants
+def synthesize_speech(seed, seconds=10, sample_rate=SAMPLE_RATE):
+    """Synthesize a deterministic speech-like AudioSegment.
+
+    Args:
+        seed (int): Seed of the random syllables, different seeds give unrelated audio.
+        seconds (float): Duration of the audio.
+        sample_rate (int): Sample rate of the audio.
+
+    Returns:
+        AudioSegment: 16-bit mono audio.
+    """
+    rng = np.random.default_rng(seed)
+    samples = np.zeros(int(sample_rate * seconds))
+    position = 0
+    while position < len(samples) - sample_rate // 2:
+        length = int(rng.uniform(0.12, 0.3) * sample_rate)
+        t = np.arange(length) / sample_rate
+        pitch = rng.uniform(100, 250) + rng.uniform(-40, 40) * t / t[-1]
+        phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+        formants = rng.uniform(300, 3000, 3)
+        syllable = sum(np.sin(h * phase) * sum(np.exp(-((h * pitch.mean() - f) / 200) ** 2) for f in formants)
+                       for h in range(1, 25))
+        samples[position:position + length] += syllable * np.sin(np.pi * np.arange(length) / length)
+        position += length + int(rng.uniform(0, 0.15) * sample_rate)
+    samples = (samples / np.abs(samples).max() * 20000).astype(np.int16)
+    return AudioSegment(samples.tobytes(), frame_rate=sample_rate, sample_width=2, channels=1)
+
+
+@pytest.fixture
+def speech():
+    return synthesize_speech
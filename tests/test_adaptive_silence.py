@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from pydub import AudioSegment
+from pydub.generators import WhiteNoise
+from pydub.silence import split_on_silence
+
+from helpers.adaptive_silence import (LoudnessHistogram, estimate_silence_threshold, split_on_adaptive_silence,
+                                      summarize_chunks)
+
+
+### function to build a recording of sentences separated by noisy pauses
+def _recording(speech, sentences=6):
+    sentences = [speech(seed, seconds=5) for seed in range(sentences)]
+    pause = AudioSegment.silent(1000, frame_rate=sentences[0].frame_rate)
+    audio = sum((sentence + pause for sentence in sentences[1:]), sentences[0] + pause)
+    noise = WhiteNoise().to_audio_segment(len(audio), volume=-55).set_frame_rate(audio.frame_rate).set_sample_width(2)
+    return audio.overlay(noise)
+
+
+def _split(audio):
+    return split_on_silence(audio, min_silence_len=500, silence_thresh=estimate_silence_threshold(audio),
+                            keep_silence=200)
+
+
+def test_histogram_percentile():
+    histogram = LoudnessHistogram()
+    histogram.update(np.array([-60.0] * 20 + [-20.0] * 80))
+
+    assert histogram.percentile(10) == pytest.approx(-60, abs=0.5)
+    assert histogram.percentile(90) == pytest.approx(-20, abs=0.5)
+
+
+@pytest.mark.parametrize("gain", [-15, 10])
+def test_threshold_follows_the_gain(speech, gain):
+    ### quiet enough that +10 dB does not clip
+    audio = _recording(speech).apply_gain(-10)
+    threshold = estimate_silence_threshold(audio)
+
+    assert audio.apply_gain(gain).max < audio.max_possible_amplitude
+    assert estimate_silence_threshold(audio.apply_gain(gain)) == pytest.approx(threshold + gain, abs=1)
+    assert summarize_chunks(_split(audio.apply_gain(gain)), 3, 15)["kept_chunks"] == 6
+
+
+def test_digital_silence_is_ignored(speech):
+    audio = _recording(speech)
+    padded = AudioSegment.silent(30000, frame_rate=audio.frame_rate) + audio
+
+    assert estimate_silence_threshold(padded) == pytest.approx(estimate_silence_threshold(audio), abs=1)
+    assert summarize_chunks(_split(padded), 3, 15)["kept_chunks"] == 6
+
+
+def test_adaptive_split_follows_level_changes(speech):
+    audio = _recording(speech).apply_gain(-20) + _recording(speech)
+
+    chunks, _ = split_on_adaptive_silence(audio, window_sec=20)
+
+    ### only the pause right at the level change may be missed
+    assert summarize_chunks(chunks, 3, 15)["kept_chunks"] >= 11
+    assert summarize_chunks(chunks, 3, 15)["kept_chunks"] > summarize_chunks(_split(audio), 3, 15)["kept_chunks"]
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from pydub import AudioSegment
+from pydub.generators import WhiteNoise
+
+from helpers.audio_fingerprint import FingerprintIndex, compute_landmark_hashes
+
+
+def _similarity(index, first, second):
+    signature = index.signature(compute_landmark_hashes(first))
+    return float(np.mean(signature == index.signature(compute_landmark_hashes(second))))
+
+
+@pytest.mark.parametrize("transform", [
+    lambda audio: AudioSegment.silent(500, frame_rate=audio.frame_rate) + audio,
+    lambda audio: audio[300:-300],
+    lambda audio: audio.set_frame_rate(22050),
+    lambda audio: audio.apply_gain(-8),
+    lambda audio: audio.overlay(WhiteNoise().to_audio_segment(len(audio), volume=-25)
+                                .set_frame_rate(audio.frame_rate).set_sample_width(2)),
+], ids=["shift", "trim", "resample", "gain", "noise"])
+def test_modified_copy_matches(speech, transform):
+    original = speech(1)
+    index = FingerprintIndex()
+    index.check_and_add("a.wav#0", original, group="a.wav")
+    index.check_and_add("c.wav#0", speech(2), group="c.wav")
+
+    duplicate_of, similarity = index.check_and_add("b.wav#0", transform(original), group="b.wav")
+
+    assert duplicate_of == "a.wav#0"
+    assert similarity >= index.threshold
+
+
+def test_unrelated_audio_does_not_match(speech):
+    index = FingerprintIndex()
+    for seed in range(6):
+        duplicate_of, _ = index.check_and_add(f"{seed}.wav#0", speech(seed), group=f"{seed}.wav")
+        assert duplicate_of is None
+    assert len(index.signatures) == 6
+
+
+def test_long_unrelated_audio_stays_below_threshold(speech):
+    index = FingerprintIndex()
+    assert _similarity(index, speech(10, seconds=60), speech(11, seconds=60)) < index.threshold
+
+
+def test_matches_within_the_same_group_are_ignored(speech):
+    audio = speech(1)
+    index = FingerprintIndex()
+    index.check_and_add("a.wav#0", audio, group="a.wav")
+
+    assert index.check_and_add("a.wav#1", audio[:8000], group="a.wav") == (None, 0.0)
+    duplicate_of, _ = index.check_and_add("b.wav#0", audio[:8000], group="b.wav")
+    assert index.groups[duplicate_of] == "a.wav"
+
+
+def test_reopened_index_treats_known_keys_as_processed(speech, tmp_path):
+    path = str(tmp_path / "fingerprints.jsonl")
+    audio = speech(1)
+    FingerprintIndex(path).check_and_add("a.wav#0", audio, group="a.wav")
+
+    index = FingerprintIndex(path)
+
+    assert index.groups["a.wav#0"] == "a.wav"
+    assert index.check_and_add("a.wav#0", audio, group="a.wav") == (None, 0.0)
+    assert index.check_and_add("b.wav#0", audio, group="b.wav")[0] == "a.wav#0"
+
+
+def test_index_built_with_other_parameters_is_rejected(speech, tmp_path):
+    path = str(tmp_path / "fingerprints.jsonl")
+    FingerprintIndex(path).check_and_add("a.wav#0", speech(1))
+
+    with pytest.raises(ValueError):
+        FingerprintIndex(path, seed=1)
@@ -0,0 +1,97 @@
+import struct
+
+import pytest
+
+from helpers.pipeline_planner import WAV_HEADER_BYTES, estimate_corpus, plan_pipeline, read_wav_headers
+
+
+HEADERS = [
+    {"path": "a.wav", "duration_sec": 100.0, "frame_rate": 16000, "channels": 2, "sample_width": 2},
+    {"path": "b.wav", "duration_sec": 300.0, "frame_rate": 16000, "channels": 2, "sample_width": 2},
+]
+IEEE_FLOAT_GUID = struct.pack("<IHH", 3, 0, 0x10) + bytes.fromhex("800000aa00389b71")
+
+
+### function to build a WAV file by hand, in formats the wave module may reject
+def _wav_bytes(frame_rate, channels, bits_per_sample, num_frames, sub_format=None):
+    block_align = channels * bits_per_sample // 8
+    if sub_format:
+        fmt = struct.pack("<HHIIHHHHI16s", 0xFFFE, channels, frame_rate, frame_rate * block_align, block_align,
+                          bits_per_sample, 22, bits_per_sample, 3, sub_format)
+    else:
+        fmt = struct.pack("<HHIIHH", 1, channels, frame_rate, frame_rate * block_align, block_align, bits_per_sample)
+    data = bytes(num_frames * block_align)
+    body = (b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"LIST" + struct.pack("<I", 3) + b"abc\0"
+            + b"data" + struct.pack("<I", len(data)) + data)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+MEASURED = {"audio_sec": 100.0, "chunks": 20, "kept_chunks": 10, "kept_sec": 80.0,
+            "decode": 1.0, "segmentation": 2.0, "export": 0.5}
+
+
+def test_estimate_scales_sample_to_corpus():
+    estimate = estimate_corpus(HEADERS, MEASURED)
+
+    assert estimate["audio_sec"] == 400
+    assert estimate["chunks"] == pytest.approx(80)
+    assert estimate["kept_chunks"] == pytest.approx(40)
+    assert estimate["kept_sec"] == pytest.approx(320)
+    assert estimate["runtime"] == pytest.approx({"decode": 4.0, "segmentation": 8.0, "export": 2.0})
+    ### chunks are exported as mono 16-bit audio at the source sample rate
+    assert estimate["chunk_bytes"] == pytest.approx(320 * 16000 * 2 + 40 * WAV_HEADER_BYTES)
+
+
+def test_estimate_models_per_chunk_costs():
+    measured = dict(MEASURED, metadata_write=0.01, metadata_per_row=0.001, asr_load=2.0, asr_per_sec=0.5)
+
+    runtime = estimate_corpus(HEADERS, measured)["runtime"]
+
+    ### metadata.csv is rewritten after each of the 40 chunks, with one more row each time
+    assert runtime["metadata"] == pytest.approx(40 * 0.01 + 0.001 * 40 * 41 / 2)
+    ### the ASR pipeline is loaded for every chunk, then transcribes 8 s on average
+    assert runtime["asr"] == pytest.approx(40 * (2.0 + 0.5 * 8))
+
+
+def test_read_wav_headers(speech, tmp_path):
+    speech(1, seconds=3).set_channels(2).export(str(tmp_path / "a.wav"), format="wav")
+
+    headers = read_wav_headers(str(tmp_path))
+
+    assert len(headers) == 1
+    assert headers[0]["duration_sec"] == pytest.approx(3, abs=0.01)
+    assert (headers[0]["frame_rate"], headers[0]["channels"], headers[0]["sample_width"]) == (16000, 2, 2)
+
+
+def test_read_wav_headers_falls_back_on_extensible_format(tmp_path):
+    (tmp_path / "a.wav").write_bytes(_wav_bytes(48000, 2, 32, 24000, sub_format=IEEE_FLOAT_GUID))
+
+    headers = read_wav_headers(str(tmp_path))
+
+    assert len(headers) == 1
+    assert headers[0]["duration_sec"] == pytest.approx(0.5)
+    assert (headers[0]["frame_rate"], headers[0]["channels"], headers[0]["sample_width"]) == (48000, 2, 4)
+
+
+def test_read_wav_headers_skips_zero_sample_rate(tmp_path, capsys):
+    (tmp_path / "a.wav").write_bytes(_wav_bytes(0, 1, 16, 100))
+    (tmp_path / "b.wav").write_bytes(b"RIFF")
+
+    assert read_wav_headers(str(tmp_path)) == []
+    out = capsys.readouterr().out
+    assert "sample rate of 0" in out and "b.wav" in out
+
+
+def test_plan_reports_missing_wav_files(tmp_path, capsys):
+    plan_pipeline(str(tmp_path / "missing"), 4, 20)
+
+    assert "No WAV files found" in capsys.readouterr().out
+
+
+def test_plan_total_says_what_it_leaves_out(speech, tmp_path, capsys):
+    for seed in range(2):
+        speech(seed, seconds=8).export(str(tmp_path / f"{seed}.wav"), format="wav")
+
+    plan_pipeline(str(tmp_path), 1, 20, sample_size=1)
+
+    assert "without ASR and the Hugging Face dataset and push" in capsys.readouterr().out